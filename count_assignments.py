@@ -1,5 +1,9 @@
+from collections import deque
 from enum import Enum, IntEnum
-from itertools import permutations
+from functools import lru_cache
+from math import factorial
+from multiprocessing import Pool
+from typing import Optional
 
 class Floor(IntEnum):
     First = 1
@@ -27,95 +31,131 @@ class AttributeType(Enum):
     Color = 'Color'
     Animal = 'Animal'
 
+# Domains of possible floors are bitmasks: bit i is set when floor i+1 is possible
+ALL_FLOORS_MASK = (1 << len(Floor)) - 1
+
+def floor_bit(floor) -> int:
+    """Bitmask holding a single floor"""
+    return 1 << (int(floor) - 1)
+
+def is_single_floor(floors: int) -> bool:
+    """True if the bitmask holds exactly one floor"""
+    return floors != 0 and not floors & (floors - 1)
+
+def shift_floors(floors: int, difference: int) -> int:
+    """Move every floor in the bitmask up by difference (down if negative), dropping floors out of range"""
+    if difference >= 0:
+        return (floors << difference) & ALL_FLOORS_MASK
+    return floors >> -difference
+
+def neighbor_floors(floors: int) -> int:
+    """Bitmask of every floor adjacent to a floor in the bitmask"""
+    return ((floors << 1) | (floors >> 1)) & ALL_FLOORS_MASK
+
+# Global index of every attribute into a flat array of floors:
+# 0-4 floors (identity), 5-9 floor of each color, 10-14 floor of each animal
+COLOR_OFFSET = len(Floor)
+ANIMAL_OFFSET = COLOR_OFFSET + len(Color)
+ATTRIBUTE_INDEX = {
+    **{floor: i for i, floor in enumerate(Floor)},
+    **{color: COLOR_OFFSET + i for i, color in enumerate(Color)},
+    **{animal: ANIMAL_OFFSET + i for i, animal in enumerate(Animal)},
+}
+
+# Static search slots of every color/animal, in enum order: (used bit, attribute index, bound bit)
+COLOR_SLOTS = tuple((1 << i, COLOR_OFFSET + i, 1 << (COLOR_OFFSET + i)) for i in range(len(Color)))
+ANIMAL_SLOTS = tuple((1 << i, ANIMAL_OFFSET + i, 1 << (ANIMAL_OFFSET + i)) for i in range(len(Animal)))
+
+# Floors array before the search: floors map to themselves, colors/animals are unbound
+INITIAL_FLOOR_OF = tuple(int(floor) for floor in Floor) + (0,) * (len(Color) + len(Animal))
+
+# Operations a hint applies to the floors of its two attributes
+OP_SAME_FLOOR = 0
+OP_DIFFERENCE = 1
+OP_NEIGHBOR = 2
+
 class Piccaso:
     """Represents the state of the Piccaso puzzle, tracking possible floors for colors and animals"""    
     def __init__(self):
-        self.floors_number = len(Floor)
-        self.color_floors = {color: set(range(1, self.floors_number+1)) for color in Color}
-        self.animal_floors = {animal: set(range(1, self.floors_number+1)) for animal in Animal}
+        self.color_floors = {color: ALL_FLOORS_MASK for color in Color}
+        self.animal_floors = {animal: ALL_FLOORS_MASK for animal in Animal}
+        # attribute type -> domains of that type, so lookups need no isinstance chain
+        self.domains_by_type = {
+            Floor: {floor: floor_bit(floor) for floor in Floor},
+            Color: self.color_floors,
+            Animal: self.animal_floors,
+        }
 
         # Track which attributes are assigned to which floors
         self.floor_colors = {}  # floor -> color (if uniquely determined)
         self.floor_animals = {}  # floor -> animal (if uniquely determined)
 
-    def get_state(self):
-        """Get current state for comparison"""
-        return (
-            {c: f.copy() for c, f in self.color_floors.items()},
-            {a: f.copy() for a, f in self.animal_floors.items()}
-        )
+        # Colors/animals whose domain shrank since the propagation loop last cleared this set
+        self.changed_attributes = set()
     
     def get_possible_floors(self, attr):
-        """Get set of possible floors for an attribute"""
-        if isinstance(attr, Floor):
-            return {int(attr)}
-        elif isinstance(attr, Color):
-            return self.color_floors[attr].copy()
-        elif isinstance(attr, Animal):
-            return self.animal_floors[attr].copy()
+        """Get the bitmask of possible floors for an attribute"""
+        return self.domains_by_type[type(attr)][attr]
         
     def set_possible_floors(self, attr, floors):
-        """Set possible floors for an attribute"""
-        if isinstance(attr, Color):
-            self.color_floors[attr] = floors.copy()
-        elif isinstance(attr, Animal):
-            self.animal_floors[attr] = floors.copy()
-        # Floor attributes are fixed
+        """Set the bitmask of possible floors for an attribute"""
+        # Floor attributes are fixed: propagators only narrow domains and fail on empty ones,
+        # so a floor is only ever written back with its own bit and never marked as changed
+        domains = self.domains_by_type[type(attr)]
+        if domains[attr] != floors:
+            domains[attr] = floors
+            self.changed_attributes.add(attr)
             
     def assign_to_floor(self, attr, floor):
         """Assign an attribute to a specific floor and propagate"""
+        bit = floor_bit(floor)
         if isinstance(attr, Color):
             self.floor_colors[floor] = attr
             # Remove this floor from other colors
             for other_color in Color:
-                if other_color != attr:
-                    self.color_floors[other_color].discard(floor)
+                if other_color != attr and self.color_floors[other_color] & bit:
+                    self.color_floors[other_color] &= ~bit
+                    self.changed_attributes.add(other_color)
         elif isinstance(attr, Animal):
             self.floor_animals[floor] = attr
             # Remove this floor from other animals
             for other_animal in Animal:
-                if other_animal != attr:
-                    self.animal_floors[other_animal].discard(floor)
-
-class FloorAssignment(object):
-    """Represents a complete assignment of colors and animals to floors"""
-    
-    def __init__(self, animal: Animal, color: Color):
-        """
-        Args:
-            animal: Animal assigned to the floor
-            color: Color assigned to the floor
-        """
-        self.animal = animal
-        self.color = color
-    
-class FloorsAssignment(object):    
-
-    def __init__(self, floor_animals: dict[int, Color], floor_colors: dict[int, Color]):
-        """
-        Args:
-            floors: List of FloorAssignment objects for each floor
-        """
-        self.floors_assignment = {floor: FloorAssignment(floor_animals.get(floor), floor_colors.get(floor)) for floor in range(1, len(Floor) + 1)}
-        self.animal_to_floor = {v.animal: k for k, v in self.floors_assignment.items() if v.animal is not None}
-        self.color_to_floor = {v.color: k for k, v in self.floors_assignment.items() if v.color is not None}
-        self.attr_to_floor = {
-            **{color: floor for floor, color in floor_colors.items()},
-            **{animal: floor for floor, animal in floor_animals.items()},
-            **{floor: floor for floor in range(1, len(Floor) + 1)}
-        }
-
-    def get_assigned_floor(self, attr):
-        return self.attr_to_floor[attr]
+                if other_animal != attr and self.animal_floors[other_animal] & bit:
+                    self.animal_floors[other_animal] &= ~bit
+                    self.changed_attributes.add(other_animal)
 
 class Hint(object):
     """Base class for all the hint classes"""
+    # Floor difference between the two attributes; only RelativeHint sets its own
+    _difference = 0
+
     def is_consistent(self) -> bool:
         raise NotImplementedError
     def propagate(self, picasso: Piccaso) -> bool:
         raise NotImplementedError
-    def satisfies(self, floors_assignment: FloorsAssignment) -> bool:
+
+    def selectivity(self) -> int:
+        """Rank of how strongly the hint prunes (lower prunes more); checking low ranks first fails fast"""
         raise NotImplementedError
+
+    def touches_floor(self) -> bool:
+        """True if one of the attributes is a concrete floor"""
+        # Floors take the first indices of ATTRIBUTE_INDEX
+        return ATTRIBUTE_INDEX[self._attr1] < COLOR_OFFSET or ATTRIBUTE_INDEX[self._attr2] < COLOR_OFFSET
+
+    def lower(self) -> tuple[int, int, int, int]:
+        """Return (op, index1, index2, difference) of the hint over the flat floors array"""
+        return (self.op, ATTRIBUTE_INDEX[self._attr1], ATTRIBUTE_INDEX[self._attr2], self._difference)
+
+    def key(self) -> tuple:
+        """Identity of the hint: its type, the attributes it relates and their difference"""
+        return (type(self).__name__, self._attr1, self._attr2, self._difference)
+
+    def __eq__(self, other):
+        return isinstance(other, Hint) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
     
 
 class AbsoluteHint(Hint):
@@ -128,6 +168,8 @@ class AbsoluteHint(Hint):
     The orange floor is the floor where the chicken lives:
         AbsoluteHint(Color.Orange, Animal.Chicken)
     """
+    op = OP_SAME_FLOOR
+
     def __init__(self, attr1, attr2):
         self._attr1 = attr1
         self._attr2 = attr2
@@ -138,8 +180,9 @@ class AbsoluteHint(Hint):
 
     def propagate(self, picasso: Piccaso):
         """Apply constraint that attr1 and attr2 are on the same floor"""
-        floors1 = picasso.get_possible_floors(self._attr1)
-        floors2 = picasso.get_possible_floors(self._attr2)
+        attr1, attr2 = self._attr1, self._attr2
+        floors1 = picasso.get_possible_floors(attr1)
+        floors2 = picasso.get_possible_floors(attr2)
         
         # They must be on same floor - intersect possibilities
         common_floors = floors1 & floors2
@@ -147,21 +190,20 @@ class AbsoluteHint(Hint):
             return False  # Impossible
         
         # Update domains
-        picasso.set_possible_floors(self._attr1, common_floors)
-        picasso.set_possible_floors(self._attr2, common_floors)
+        picasso.set_possible_floors(attr1, common_floors)
+        picasso.set_possible_floors(attr2, common_floors)
         
         # If there's only one possible floor, enforce the assignment
-        if len(common_floors) == 1:
-            floor = next(iter(common_floors))
-            picasso.assign_to_floor(self._attr1, floor)
-            picasso.assign_to_floor(self._attr2, floor)
+        if is_single_floor(common_floors):
+            floor = common_floors.bit_length()
+            picasso.assign_to_floor(attr1, floor)
+            picasso.assign_to_floor(attr2, floor)
         
         return True
     
-    def satisfies(self, floors_assignment: FloorsAssignment):
-        floor1 = floors_assignment.get_assigned_floor(self._attr1)
-        floor2 = floors_assignment.get_assigned_floor(self._attr2)
-        return floor1 == floor2
+    def selectivity(self):
+        # Bound to a concrete floor, the hint fixes its other attribute
+        return 0 if self.touches_floor() else 3
 
 class RelativeHint(Hint):
     """
@@ -175,12 +217,18 @@ class RelativeHint(Hint):
     The third floor is two floors below the fifth floor:
         RelativeHint(Floor.Third, Floor.Fifth, -2)
     """
+    op = OP_DIFFERENCE
+
     def __init__(self, attr1, attr2, difference):
         self._attr1 = attr1
         self._attr2 = attr2
         self._difference = difference
 
     def is_consistent(self):
+        # Floors are whole numbers, so a fractional (or NaN/infinite) difference can never hold
+        if not float(self._difference).is_integer():
+            return False
+
         # Only validate if both are floors
         if self._attr1 == self._attr2:
             return self._difference == 0
@@ -194,28 +242,26 @@ class RelativeHint(Hint):
 
     def propagate(self, picasso: Piccaso):
         """Apply constraint that attr1 - difference = attr2 (in terms of floors)"""
-        floors1 = picasso.get_possible_floors(self._attr1)
-        floors2 = picasso.get_possible_floors(self._attr2)
+        # int() since the bit shifts need an integral difference (1.0 is accepted as 1)
+        attr1, attr2, difference = self._attr1, self._attr2, int(self._difference)
+        floors1 = picasso.get_possible_floors(attr1)
+        floors2 = picasso.get_possible_floors(attr2)
         
         # For attr1: only floors where floor - difference is in floors2
-        valid_floors1 = {f for f in floors1 if f - self._difference in floors2}
+        valid_floors1 = floors1 & shift_floors(floors2, difference)
         # For attr2: only floors where floor + difference is in floors1  
-        valid_floors2 = {f for f in floors2 if f + self._difference in floors1}
+        valid_floors2 = floors2 & shift_floors(floors1, -difference)
         
         if not valid_floors1 or not valid_floors2:
             return False
         
-        picasso.set_possible_floors(self._attr1, valid_floors1)
-        picasso.set_possible_floors(self._attr2, valid_floors2)
+        picasso.set_possible_floors(attr1, valid_floors1)
+        picasso.set_possible_floors(attr2, valid_floors2)
         
         return True
-    
-    def satisfies(self, floors_assignment: FloorsAssignment):
-        attr1, attr2 = self._attr1, self._attr2
-        floor1 = floors_assignment.get_assigned_floor(attr1)
-        floor2 = floors_assignment.get_assigned_floor(attr2)
-        difference = self._difference
-        return floor1 - difference == floor2
+
+    def selectivity(self):
+        return 1 if self.touches_floor() else 3
 
 
 class NeighborHint(Hint):
@@ -230,6 +276,8 @@ class NeighborHint(Hint):
     The yellow floor is neighboring the third floor:
         NeighborHint(Color.Yellow, Floor.Third)
     """
+    op = OP_NEIGHBOR
+
     def __init__(self, attr1, attr2):
         self._attr1 = attr1
         self._attr2 = attr2
@@ -239,34 +287,27 @@ class NeighborHint(Hint):
 
     def propagate(self, picasso: Piccaso):
         """Apply constraint that attr1 and attr2 are on adjacent floors"""
-        floors1 = picasso.get_possible_floors(self._attr1)
-        floors2 = picasso.get_possible_floors(self._attr2)
+        attr1, attr2 = self._attr1, self._attr2
+        floors1 = picasso.get_possible_floors(attr1)
+        floors2 = picasso.get_possible_floors(attr2)
         
         # For attr1: only floors that have a neighbor in floors2
-        valid_floors1 = set()
-        for f in floors1:
-            if (f-1 in floors2) or (f+1 in floors2):
-                valid_floors1.add(f)
-        
-        # For attr2: only floors that have a neighbor in floors1
-        valid_floors2 = set()
-        for f in floors2:
-            if (f-1 in floors1) or (f+1 in floors1):
-                valid_floors2.add(f)
-        
-        if not valid_floors1 or not valid_floors2:
+        valid_floors1 = floors1 & neighbor_floors(floors2)
+        if not valid_floors1:
             return False
         
-        picasso.set_possible_floors(self._attr1, valid_floors1)
-        picasso.set_possible_floors(self._attr2, valid_floors2)
+        # For attr2: only floors that have a neighbor in valid_floors1 (every floor of
+        # valid_floors1 keeps its neighbor in floors2, so one pass is enough)
+        valid_floors2 = floors2 & neighbor_floors(valid_floors1)
+        
+        picasso.set_possible_floors(attr1, valid_floors1)
+        picasso.set_possible_floors(attr2, valid_floors2)
         
         return True
-    
-    def satisfies(self, floors_assignment: FloorsAssignment):
-        attr1, attr2 = self._attr1, self._attr2
-        floor1 = floors_assignment.get_assigned_floor(attr1)
-        floor2 = floors_assignment.get_assigned_floor(attr2)
-        return abs(floor1 - floor2) == 1
+
+    def selectivity(self):
+        # A neighbor has two possible floors, so it prunes the least
+        return 2 if self.touches_floor() else 4
 
 class PiccasoSolver:
     def __init__(self):
@@ -274,68 +315,261 @@ class PiccasoSolver:
 
 
     def propagate_constraints(self, hints: list[Hint]) -> bool:
-        """Apply all hints with constraint propagation until convergence"""
+        """
+        Apply all hints with AC-3 style propagation until convergence.
+        A worklist holds the hints to revise; whenever a domain shrinks, every hint
+        mentioning that color/animal is enqueued again.
+        """
         if not all(h.is_consistent() for h in hints):
-            return False    
-
-        prev_state = None
-
-        while True:
-            current_state = self.picasso.get_state()
-
-            if current_state == prev_state:
-                break  # No more changes — fixpoint reached
-
-            prev_state = current_state
-
-            for hint in hints:
-                if not hint.propagate(self.picasso):
-                    return False
-
-            # After processing all hints, check for unique assignments
-            for color in Color:
-                if len(self.picasso.color_floors[color]) == 1:
-                    floor = next(iter(self.picasso.color_floors[color]))
-                    if floor not in self.picasso.floor_colors:
-                        self.picasso.assign_to_floor(color, floor)
+            return False
 
-            for animal in Animal:
-                if len(self.picasso.animal_floors[animal]) == 1:
-                    floor = next(iter(self.picasso.animal_floors[animal]))
-                    if floor not in self.picasso.floor_animals:
-                        self.picasso.assign_to_floor(animal, floor)
+        # attribute -> indices of the hints that mention it
+        watchers = {}
+        for i, hint in enumerate(hints):
+            for attr in (hint._attr1, hint._attr2):
+                watchers.setdefault(attr, []).append(i)
+
+        worklist = deque(range(len(hints)))
+        queued = set(worklist)
+        changed = self.picasso.changed_attributes
+        changed.clear()
+
+        while worklist:
+            i = worklist.popleft()
+            queued.discard(i)
+
+            if not hints[i].propagate(self.picasso):
+                return False
+            self.assign_unique_floors()
+
+            # The domains report their own shrinking, so no state snapshot is needed
+            for attr in changed:
+                if not self.picasso.get_possible_floors(attr):
+                    return False  # domain wiped out
+                for j in watchers.get(attr, ()):
+                    if j not in queued:
+                        queued.add(j)
+                        worklist.append(j)
+            changed.clear()
 
-        
         return True
-            
-    def count_valid_assignments(self, hints: list[Hint]) -> int:
-        unassigned_colors = set(c for c in Color if c not in self.picasso.floor_colors.values())
-        unassigned_animals = set(a for a in Animal if a not in self.picasso.floor_animals.values())
-
-        unassigned_colors_floors = set(f for f in Floor if f not in self.picasso.floor_colors)
-        unassigned_animals_floors = set(f for f in Floor if f not in self.picasso.floor_animals)
-
-        # use permutations to generate all possible assignments        
-        count = 0
-        for color_perm in permutations(unassigned_colors):
-            for animal_perm in permutations(unassigned_animals):
-                # Create a temporary assignment
-                trial_color_floors = self.picasso.floor_colors.copy()
-                trial_animal_floors = self.picasso.floor_animals.copy()
-                
-                # Assign colors and animals to floors
-                for c, floor in zip(color_perm, unassigned_colors_floors):                    
-                    trial_color_floors[int(floor)] = c
-
-                for a, floor in zip(animal_perm, unassigned_animals_floors):
-                    trial_animal_floors[int(floor)] = a
-                
-                # Check if this assignment satisfies all hints
-                floors_assignment = FloorsAssignment(trial_animal_floors, trial_color_floors)
-                if all(hint.satisfies(floors_assignment) for hint in hints):
+
+    def assign_unique_floors(self):
+        """Assign every color/animal whose domain was narrowed down to a single floor"""
+        for color in Color:
+            if is_single_floor(self.picasso.color_floors[color]):
+                floor = self.picasso.color_floors[color].bit_length()
+                if floor not in self.picasso.floor_colors:
+                    self.picasso.assign_to_floor(color, floor)
+
+        for animal in Animal:
+            if is_single_floor(self.picasso.animal_floors[animal]):
+                floor = self.picasso.animal_floors[animal].bit_length()
+                if floor not in self.picasso.floor_animals:
+                    self.picasso.assign_to_floor(animal, floor)
+
+    def count_valid_assignments(self, hints: list[Hint], processes: int = 1) -> int:
+        """
+        Count the complete assignments left after propagation that satisfy all hints.
+        With processes > 1 the search is split across a pool of worker processes.
+        """
+        color_domains = [self.picasso.color_floors[c] for c in Color]
+        animal_domains = [self.picasso.animal_floors[a] for a in Animal]
+        lowered = [hint.lower() for hint in hints]
+        if processes > 1:
+            return count_kernel_parallel(color_domains, animal_domains, lowered, processes)
+        return count_kernel(color_domains, animal_domains, lowered)
+
+def hint_expression(op: int, index1: int, index2: int, difference: int) -> str:
+    """Python expression of a lowered hint over the flat floors array F"""
+    if op == OP_SAME_FLOOR:
+        return f'F[{index1}] == F[{index2}]'
+    elif op == OP_DIFFERENCE:
+        return f'F[{index1}] - F[{index2}] == {difference}'
+    return f'F[{index1}] - F[{index2}] in (1, -1)'
+
+@lru_cache(maxsize=128)
+def compile_checker(index: int, hints: tuple[tuple[int, int, int, int], ...]):
+    """
+    Generate and compile check(F, bound) for the lowered hints mentioning the attribute index:
+    a single and-chain of their expressions, each guarded by its other attribute being bound.
+    Returns None when there is nothing to check.
+    Cached, so repeated hint sets skip code generation and compile().
+    """
+    terms = []
+    for op, index1, index2, difference in hints:
+        expression = hint_expression(op, index1, index2, difference)
+        other = index2 if index1 == index else index1
+        if other < COLOR_OFFSET or other == index:
+            terms.append(f'({expression})')  # floors are always bound
+        else:
+            terms.append(f'(not bound & {1 << other} or {expression})')
+    if not terms:
+        return None
+
+    namespace = {}
+    exec(f'def check(F, bound):\n    return {" and ".join(terms)}\n', namespace)
+    return namespace['check']
+
+def count_free_permutations(domains: list[int]) -> Optional[int]:
+    """
+    Number of ways to put the attributes with these domains on distinct floors, when that is
+    a plain factorial: every attribute not fixed to a single floor may take any floor the
+    fixed ones left. Returns None otherwise.
+    """
+    taken = 0
+    fixed = 0
+    for domain in domains:
+        if is_single_floor(domain):
+            if taken & domain:
+                return 0  # two attributes fixed to the same floor
+            taken |= domain
+            fixed += 1
+
+    free_floors = ALL_FLOORS_MASK & ~taken
+    if any(domain != free_floors for domain in domains if not is_single_floor(domain)):
+        return None
+    return factorial(len(domains) - fixed)
+
+def count_kernel(color_domains: list[int], animal_domains: list[int],
+                 lowered: list[tuple[int, int, int, int]]) -> int:
+    """
+    Count complete assignments with a depth-first search that fills one floor at a time.
+    Works on plain ints only: floor bitmasks for the domains, hints lowered by Hint.lower(),
+    and a flat array holding the floor of every attribute index (see ATTRIBUTE_INDEX).
+    A hint is checked as soon as both attributes it references are bound, by a checker
+    generated for the attribute just bound (see compile_checker).
+    """
+    floors_number = len(Floor)
+
+    # attribute index -> lowered hints mentioning it
+    watched = [[] for _ in ATTRIBUTE_INDEX]
+    for hint in lowered:
+        _, index1, index2, _ = hint
+        watched[index1].append(hint)
+        if index2 != index1:
+            watched[index2].append(hint)
+    # The search only binds colors and animals, so floors never need a checker
+    checkers = [None] * COLOR_OFFSET + [compile_checker(index, tuple(watched[index]))
+                                        for index in range(COLOR_OFFSET, len(ATTRIBUTE_INDEX))]
+
+    # floor_of[i] is the floor of the attribute with index i; floors are bound from the start
+    floor_of = bytearray(INITIAL_FLOOR_OF)
+    initial_bound = (1 << COLOR_OFFSET) - 1
+
+    # Colors/animals narrowed down to a single floor are placed once before the search, so
+    # hints on them are checked as soon as their other attribute is bound
+    for slots, domains in ((COLOR_SLOTS, color_domains), (ANIMAL_SLOTS, animal_domains)):
+        for (_, index, bound_bit), domain in zip(slots, domains):
+            if is_single_floor(domain):
+                floor_of[index] = domain.bit_length()
+                initial_bound |= bound_bit
+                checkers[index] = None  # its hints are checked by the other attribute, or below
+
+    # Hints between placed attributes are checked once, up front
+    for op, index1, index2, difference in lowered:
+        if initial_bound >> index1 & initial_bound >> index2 & 1:
+            delta = floor_of[index1] - floor_of[index2]
+            if op == OP_SAME_FLOOR:
+                holds = delta == 0
+            elif op == OP_DIFFERENCE:
+                holds = delta == difference
+            else:
+                holds = delta == 1 or delta == -1
+            if not holds:
+                return 0
+
+    # No hint left on the free colors/animals: count the permutations directly when possible
+    if not any(checkers[COLOR_OFFSET:]):
+        free_colors = count_free_permutations(color_domains)
+        free_animals = count_free_permutations(animal_domains)
+        if free_colors is not None and free_animals is not None:
+            return free_colors * free_animals
+
+    # floor -> (used bit, attribute index, bound bit, checker) of every color/animal whose
+    # domain holds it, built once so the search allocates and recomputes nothing per trial
+    color_candidates = [[] for _ in range(floors_number + 1)]
+    animal_candidates = [[] for _ in range(floors_number + 1)]
+    for candidates, domains, slots in ((color_candidates, color_domains, COLOR_SLOTS),
+                                       (animal_candidates, animal_domains, ANIMAL_SLOTS)):
+        for floor in range(1, floors_number + 1):
+            floor_mask = floor_bit(floor)
+            for (used_bit, index, bound_bit), domain in zip(slots, domains):
+                if domain & floor_mask:
+                    candidates[floor].append((used_bit, index, bound_bit, checkers[index]))
+
+    # Iterative depth-first search over pending nodes:
+    # (floor to fill, color used mask, animal used mask, bound mask, and the color/animal
+    # indices placed on the floor below, which siblings' subtrees may have overwritten)
+    count = 0
+    stack = [(1, 0, 0, initial_bound, 0, 0)]
+    while stack:
+        floor, color_used_mask, animal_used_mask, bound_mask, color_below, animal_below = stack.pop()
+        if floor > 1:
+            floor_of[color_below] = floor_of[animal_below] = floor - 1
+        last_floor = floor == floors_number
+
+        for color_bit, color_index, color_bound_bit, color_check in color_candidates[floor]:
+            if color_used_mask & color_bit:
+                continue
+            floor_of[color_index] = floor
+            color_bound = bound_mask | color_bound_bit
+            if color_check is not None and not color_check(floor_of, color_bound):
+                continue
+
+            for animal_bit, animal_index, animal_bound_bit, animal_check in animal_candidates[floor]:
+                if animal_used_mask & animal_bit:
+                    continue
+                floor_of[animal_index] = floor
+                animal_bound = color_bound | animal_bound_bit
+                if animal_check is not None and not animal_check(floor_of, animal_bound):
+                    continue
+
+                if last_floor:
                     count += 1
+                else:
+                    stack.append((floor + 1, color_used_mask | color_bit, animal_used_mask | animal_bit,
+                                  animal_bound, color_index, animal_index))
+    return count
+
+def first_floor_domains(color_domains: list[int], ci: int) -> list[int]:
+    """Color domains where only the color with index ci may take the first floor"""
+    first_floor = floor_bit(Floor.First)
+    return [d if i == ci else d & ~first_floor for i, d in enumerate(color_domains)]
+
+# (color_domains, animal_domains, lowered) shared by every task of a pool worker
+_worker_search = None
+
+def _init_worker(color_domains, animal_domains, lowered):
+    """Pool initializer: receive the search tables once per worker instead of once per task"""
+    global _worker_search
+    _worker_search = (color_domains, animal_domains, lowered)
+
+def _count_first_color(ci) -> int:
+    """Count the assignments whose first floor has the color with index ci"""
+    color_domains, animal_domains, lowered = _worker_search
+    return count_kernel(first_floor_domains(color_domains, ci), animal_domains, lowered)
+
+def count_kernel_parallel(color_domains: list[int], animal_domains: list[int],
+                          lowered: list[tuple[int, int, int, int]], processes: int) -> int:
+    """
+    Same count as count_kernel, split into one task per color that may take the first floor.
+    Each task keeps the first floor only in the domain of its own color, so the tasks are
+    disjoint and together cover every assignment.
+    """
+    first_floor = floor_bit(Floor.First)
+    tasks = [ci for ci, domain in enumerate(color_domains) if domain & first_floor]
 
-        return count
+    try:
+        # Pools need working sem_open, which some platforms lack
+        import multiprocessing.synchronize
+    except ImportError:
+        return sum(count_kernel(first_floor_domains(color_domains, ci), animal_domains, lowered)
+                   for ci in tasks)
+
+    with Pool(min(processes, len(tasks) or 1), initializer=_init_worker,
+              initargs=(color_domains, animal_domains, lowered)) as pool:
+        return sum(pool.imap_unordered(_count_first_color, tasks))
 
 # Test cases - corrected based on problem description
 HINTS_EX1 = [
@@ -386,17 +620,31 @@ HINTS_EX8 = [
     AbsoluteHint(Floor.First, Color.Red),
     AbsoluteHint(Floor.First, Color.Green)
 ]
-                            
-def count_assignments(hints):
+
+# expects 4608: red and the frog take one of the 8 ordered pairs of adjacent floors
+HINTS_EX9 = [
+    NeighborHint(Color.Red, Animal.Frog)
+]
+
+@lru_cache(maxsize=1024)
+def _count_hint_set(hints: frozenset, processes: int) -> int:
+    """Solve one hint set; cached, since the order of the hints does not matter"""
+    # Most selective hints first: they fix floors early in propagation and fail first in checks
+    hints = sorted(hints, key=lambda hint: hint.selectivity())
+    solver = PiccasoSolver()
+    if not solver.propagate_constraints(hints):
+        return 0
+    return solver.count_valid_assignments(hints, processes)
+
+def count_assignments(hints, processes=1):
     """
     Given a list of Hint objects, return the number of
     valid assignments that satisfy these hints.
     Uses efficient constraint propagation when possible.
+    Pass processes > 1 to split the search across worker processes; for five floors
+    the search takes milliseconds, so starting the pool makes this slower than serial.
     """
-    solver = PiccasoSolver()
-    if not solver.propagate_constraints(hints):
-        return 0
-    return solver.count_valid_assignments(hints)
+    return _count_hint_set(frozenset(hints), processes)
 
 def test():
     assert count_assignments(HINTS_EX1) == 2, 'Failed on example #1'
@@ -407,6 +655,12 @@ def test():
     assert count_assignments(HINTS_EX6) == 720, 'Failed on example #6'
     assert count_assignments(HINTS_EX7) == 0, 'Failed on example #7'
     assert count_assignments(HINTS_EX8) == 0, 'Failed on example #8'
+    assert count_assignments(HINTS_EX2[::-1]) == 4, 'Failed on reordered example #2'
+    assert count_assignments(HINTS_EX9) == 4608, 'Failed on example #9'
+    assert count_assignments(HINTS_EX9, processes=2) == count_assignments(HINTS_EX9), \
+        'Pooled and serial counts differ on example #9'
+    assert count_assignments([RelativeHint(Color.Red, Color.Blue, 1.0)]) == 2880, 'Failed on an integral float difference'
+    assert count_assignments([RelativeHint(Color.Red, Color.Blue, 1.5)]) == 0, 'Failed on a fractional difference'
     
     print('\nAll tests passed!')
     